@@ -110,6 +110,7 @@ array([(51.0, 39.0, 1989.0, 1.0), (64.0, 54.0, 3456.0, 1.0),
       dtype=[('x1', '<f8'), ('x3', '<f8'), ('x1*x3', '<f8'), ('1', '<f8')])
 '''
 
+import functools
 import itertools
 import warnings
 from string import ascii_letters, digits
@@ -125,11 +126,105 @@ from nipy.algorithms.utils.matrices import full_rank, matrix_rank
 # Legacy repr printing from numpy.
 from nipy.utils import VisibleDeprecationWarning, _NoValue
 
+# Optional just-in-time compilation of design expressions.
+try:
+    import numba
+except ImportError:
+    numba = None
 
+
+@functools.lru_cache(maxsize=1024)
 def _to_str(s):
     return s.decode('latin1') if isinstance(s, bytes) else str(s)
 
 
+@functools.lru_cache(maxsize=4096)
+def _sort_key(expr):
+    """ Memoized ``default_sort_key``
+
+    Building a sort key walks the whole expression tree; the same
+    expressions get sorted over and over across Formula operations, so
+    cache the keys - they are pure functions of the (hashable)
+    expression.
+    """
+    return default_sort_key(expr)
+
+
+def _expr_seq(expression):
+    """ Return tuple of sympified expressions in `expression`
+
+    `expression` may be a single expression, a Formula, or a (possibly
+    nested) sequence or array of expressions.  The single-expression
+    and Formula cases - the hot ones - avoid building an intermediate
+    object-dtype array just to flatten it again.
+    """
+    if is_formula(expression):
+        flat = expression._terms
+    elif isinstance(expression, (np.ndarray, list, tuple)):
+        flat = np.ravel(expression)
+    else:
+        flat = (expression,)
+    return tuple(sympy.sympify(e) for e in flat)
+
+
+def _column_fast_path(expr, arg_index):
+    """ Direct evaluator for simple design columns, or None
+
+    A design expression that is a number (the intercept), a bare
+    symbol, or a product of symbols with positions in `arg_index` can
+    be evaluated by indexing (and multiplying) the argument columns
+    directly.  This covers the linear-regression common case without
+    any lambdify code generation.  Return None when `expr` needs the
+    generic path.
+    """
+    if expr.is_Number:
+        value = float(expr)
+        return lambda *args: value
+    idx = arg_index.get(expr)
+    if idx is not None:
+        return lambda *args: args[idx]
+    if isinstance(expr, sympy.Mul):
+        idxs = [arg_index.get(factor) for factor in expr.args]
+        if None in idxs:
+            return None
+
+        def prod(*args):
+            col = args[idxs[0]] * args[idxs[1]]
+            for i in idxs[2:]:
+                col = col * args[i]
+            return col
+
+        return prod
+    return None
+
+
+def _maybe_njit(func):
+    """ Return jit-compiled version of `func` if numba is available
+
+    Lambdified design expressions chain one numpy ufunc call (and one
+    temporary array) per subexpression; numba fuses these into a single
+    loop over the rows.  If numba is not installed, or cannot compile
+    `func` - for example when the expression contains implemented
+    functions, which are plain Python callables - fall back to calling
+    `func` directly.
+    """
+    if numba is None:
+        return func
+    jitted = numba.njit(func)
+    use_jit = True
+
+    def wrapper(*args):
+        nonlocal use_jit
+        if use_jit:
+            try:
+                return jitted(*args)
+            except Exception:
+                use_jit = False
+        return func(*args)
+
+    return wrapper
+
+
 @np.deprecate(message = "Please use sympy.Dummy instead of this function")
 def make_dummy(name):
     """ Make dummy variable of given name
@@ -192,7 +287,10 @@ class Term(sympy.Symbol):
                        doc="Return a Formula with only terms=[self].")
 
     def __add__(self, other):
-        if self == other:
+        # sympy's symbol cache hash-conses Term construction -
+        # Term('x') is Term('x') - so equal terms are normally the very
+        # same object and the identity check settles the common case.
+        if self is other or self == other:
             return self
         return sympy.Symbol.__add__(self, other)
 
@@ -259,8 +357,7 @@ class FactorTerm(Term):
         return new
 
     def __mul__(self, other):
-
-        if self == other:
+        if self is other or self == other:
             return self
         else:
             return sympy.Symbol.__mul__(self, other)
@@ -294,20 +391,25 @@ def getparams(expression):
     >>> getparams(f.mean*sympy.exp(th))
     [_b0, _b1, _b2, theta]
     """
+    return list(_getparams_cached(_expr_seq(expression)))
+
+
+@functools.lru_cache(maxsize=128)
+def _getparams_cached(expressions):
+    """ Workhorse for :func:`getparams` over tuple `expressions`
+
+    Sympy expressions are hashable and structurally canonical, so the
+    result is a pure function of the input tuple and can be memoized.
+    """
     atoms = set()
-    expression = np.array(expression)
-    if expression.shape == ():
-        expression = expression.reshape((1,))
-    if expression.ndim > 1:
-        expression = expression.reshape((np.prod(expression.shape),))
-    for term in expression:
-        atoms = atoms.union(sympy.sympify(term).atoms())
-    params = []
-    for atom in atoms:
-        if isinstance(atom, sympy.Symbol) and not is_term(atom):
-            params.append(atom)
-    params.sort(key=default_sort_key)
-    return params
+    for expr in expressions:
+        # atoms(Symbol) lets sympy skip non-Symbol nodes internally;
+        # update mutates in place rather than allocating a new set per
+        # expression.
+        atoms.update(expr.atoms(sympy.Symbol))
+    params = [atom for atom in atoms if not is_term(atom)]
+    params.sort(key=_sort_key)
+    return tuple(params)
 
 
 def getterms(expression):
@@ -322,20 +424,19 @@ def getterms(expression):
     >>> getterms(f.mean)
     [x, y, z]
     """
+    return list(_getterms_cached(_expr_seq(expression)))
+
+
+@functools.lru_cache(maxsize=128)
+def _getterms_cached(expressions):
+    """ Workhorse for :func:`getterms` over tuple `expressions`
+    """
     atoms = set()
-    expression = np.array(expression)
-    if expression.shape == ():
-        expression = expression.reshape((1,))
-    if expression.ndim > 1:
-        expression = expression.reshape((np.prod(expression.shape),))
-    for e in expression:
-        atoms = atoms.union(e.atoms())
-    terms = []
-    for atom in atoms:
-        if is_term(atom):
-            terms.append(atom)
-    terms.sort(key=default_sort_key)
-    return terms
+    for e in expressions:
+        atoms.update(e.atoms(sympy.Symbol))
+    terms = [atom for atom in atoms if is_term(atom)]
+    terms.sort(key=_sort_key)
+    return tuple(terms)
 
 
 def _recarray_from_array(arr, names, drop_name_dim=_NoValue):
@@ -363,8 +464,11 @@ def _recarray_from_array(arr, names, drop_name_dim=_NoValue):
     dtype = np.dtype([(n, arr.dtype) for n in names])
     # At least for numpy <= 1.7.1, the dimension that numpy applies the names
     # to depends on the memory layout (C or F).  Ensure C layout for consistent
-    # application of names to last dimension.
-    rec_arr = np.ascontiguousarray(arr).view(dtype)
+    # application of names to last dimension.  Copy only when the input is not
+    # already C contiguous.
+    if not arr.flags.c_contiguous:
+        arr = np.ascontiguousarray(arr)
+    rec_arr = arr.view(dtype)
     if can_name_drop and drop_name_dim:
         rec_arr.shape = arr.shape[:-1]
     return rec_arr
@@ -450,9 +554,20 @@ def make_recarray(rows, names, dtypes=None, drop_name_dim=_NoValue):
         if len(names) != 1:  # a 'row vector'
             return np.array(tuple(irows), dtype)
         return np.array([(r,) for r in irows], dtype)
+    if dtypes is None:
+        # All fields are float64, so we can build a dense 2D float
+        # array and view it as structured - no Python tuple per row,
+        # no structured-array tuple parsing.
+        arr = np.array(list(irows), np.float64)
+        return arr.view(dtype).reshape(arr.shape[0])
     return np.array([tuple(r) for r in irows], dtype)
 
 
+# Counter supplying offsets for the placeholder symbol names built in
+# Formula._setup_design.
+_placeholder_offsets = itertools.count()
+
+
 class Formula:
     """ A Formula is a model for a mean in a regression model.
 
@@ -474,9 +589,16 @@ class Formula:
         char : str, optional
             character for regression coefficient
         """
-        self._terms = np.asarray(seq)
+        # Store the terms as a plain tuple; sympy expressions are
+        # ordinary Python objects, and iterating or hashing a tuple
+        # avoids numpy's object-dtype boxing on every access.  The
+        # ``terms`` property still presents them as an object array.
+        self._terms = tuple(seq)
         self._counter = 0
         self.char = char
+        # Key for the cached output of _setup_design; None means the
+        # design callable has not been built yet.
+        self._setup_key = None
 
     # Properties
     def _getcoefs(self):
@@ -495,8 +617,10 @@ class Formula:
         Rmode = False
         if Rmode:
             if sympy.Number(1) not in self._terms:
-                t = np.array(list(t) + [sympy.Number(1)])
-        return t
+                t = t + (sympy.Number(1),)
+        if not hasattr(self, '_terms_arr'):
+            self._terms_arr = np.asarray(t)
+        return self._terms_arr
     terms = property(_getterms, doc='Terms in the linear regression formula.')
 
     def _getmean(self):
@@ -505,15 +629,37 @@ class Formula:
         Expression for the mean, expressed as a linear combination of
         terms, each with dummy variables in front.
         """
-        b = [self.coefs[term] for term in self.terms]
-        return np.sum(np.array(b)*self.terms)
+        if not hasattr(self, '_mean'):
+            # Build the sum directly in sympy; going through object
+            # dtype numpy arrays dispatches to Python per element for
+            # both the multiplies and the reduction.
+            self._mean = sympy.Add(*[self.coefs[term]*term
+                                     for term in self.terms])
+        return self._mean
     mean = property(_getmean, doc="Expression for the mean, expressed "
                     "as a linear combination of terms, each with dummy "
                     "variables in front.")
 
     def _getdiff(self):
-        params = sorted(set(getparams(self.mean)), key=default_sort_key)
-        return [sympy.diff(self.mean, p).doit() for p in params]
+        mean = self.mean
+        # getparams already returns unique, sorted parameters
+        params = getparams(mean)
+        # The mean is linear in the regression coefficients - it is the
+        # sum of coefs[term] * term - so the derivative with respect to
+        # each coefficient is just the corresponding term (or their sum,
+        # for repeated terms), with no need for generic sympy
+        # differentiation.  Only parameters appearing inside the terms
+        # themselves (nonlinear models) need sympy.diff.
+        coef_terms = {}
+        for term in self.terms:
+            coef_terms.setdefault(self.coefs[term], []).append(term)
+        d = []
+        for p in params:
+            if p in coef_terms:
+                d.append(sympy.Add(*coef_terms[p]))
+            else:
+                d.append(sympy.diff(mean, p).doit())
+        return d
     design_expr = property(_getdiff)
 
     def _getdtype(self):
@@ -630,7 +776,7 @@ class Formula:
         """
         if not is_formula(other):
             raise ValueError('only Formula objects can be added to a Formula')
-        f = Formula(np.hstack([self.terms, other.terms]))
+        f = Formula(self._terms + tuple(other._terms))
         return f
 
     def __sub__(self, other):
@@ -700,15 +846,22 @@ class Formula:
                     v.append(Term.__mul__(oterm, sterm))
                 else:
                     v.append(sterm*oterm)
-        terms = sorted(set(v), key=default_sort_key)
+        terms = sorted(set(v), key=_sort_key)
         return Formula(tuple(terms))
 
     def __eq__(self, other):
-        s = np.array(self)
-        o = np.array(other)
-        if s.shape != o.shape:
+        if self is other:
+            return True
+        if is_formula(other):
+            oterms = other._terms
+        else:
+            oterms = tuple(np.ravel(other))
+        if len(self._terms) != len(oterms):
             return False
-        return np.all(np.equal(np.array(self), np.array(other)))
+        return all(s == o for s, o in zip(self._terms, oterms))
+
+    def __hash__(self):
+        return hash(self._terms)
 
     def _setup_design(self):
         """ Initialize design
@@ -716,7 +869,16 @@ class Formula:
         Create a callable object to evaluate the design matrix at a given set
         of parameter values to be specified by a recarray and observed Term
         values, also specified by a recarray.
+
+        The lambdified callable and associated dtypes are pure functions
+        of ``self.terms``, so we cache them keyed on the terms, and skip
+        the sympy work entirely when called again with the same terms.
+        This matters when the same design is evaluated many times, as in
+        GLM fits over many voxels or subjects.
         """
+        key = tuple(sympy.srepr(t) for t in self._terms)
+        if getattr(self, '_setup_key', None) == key:
+            return
         # the design expression is the differentiation of the expression
         # for the mean.  It is a list
         d = self.design_expr
@@ -729,25 +891,24 @@ class Formula:
         # that does not care about the names of the terms.
 
         # First, find all terms in the mean expression,
-        # and rename them in the form "__t%d__" with a
-        # random offset.
+        # and rename them in the form "__t%d__" with an offset
+        # from a module-level counter.
         # This may cause a possible problem
         # when there are parameters named something like "__t%d__".
-        # Using the random offset will minimize the possibility
-        # of this happening.
+        # Using a fresh offset per setup will minimize the possibility
+        # of this happening.  A counter, unlike the np.random.randint
+        # draw used previously, does not mutate the global numpy RNG
+        # state and so keeps user code reproducible.
 
         # This renaming is here principally because of the intercept.
 
-        random_offset = np.random.randint(low=0, high=2**30)
+        offset = next(_placeholder_offsets)
 
         terms = getterms(self.mean)
 
-        newterms = []
-        for i, t in enumerate(terms):
-            newt = sympy.Symbol("__t%d__" % (i + random_offset))
-            for j, _ in enumerate(d):
-                d[j] = d[j].subs(t, newt)
-            newterms.append(newt)
+        term_map = {t: sympy.Symbol("__t%d__" % (i + offset))
+                    for i, t in enumerate(terms)}
+        newterms = list(term_map.values())
 
         # Next, find all parameters that remain in the design expression.
         # In a standard regression model, there will be no parameters
@@ -755,12 +916,15 @@ class Formula:
         # self.design_expr. In nonlinear models, parameters will remain.
 
         params = getparams(self.design_expr)
-        newparams = []
-        for i, p in enumerate(params):
-            newp = Dummy("__p%d__" % (i + random_offset))
-            for j, _ in enumerate(d):
-                d[j] = d[j].subs(p, newp)
-            newparams.append(newp)
+        param_map = {p: Dummy("__p%d__" % (i + offset))
+                     for i, p in enumerate(params)}
+        newparams = list(param_map.values())
+
+        # We are only swapping Symbol for Symbol, so use xreplace - a
+        # pure structural replacement - rather than subs, which walks
+        # the tree doing mathematical substitution for every
+        # (expression, symbol) pair.
+        d = [expr.xreplace(term_map).xreplace(param_map) for expr in d]
 
         # If there are any aliased functions, these need to be added
         # to the name space before sympy lambdifies the expression
@@ -769,9 +933,35 @@ class Formula:
         # the natural splines, etc. You can represent natural splines
         # with sympy but the expression is pretty awful.  Note that
         # ``d`` here is list giving the differentiation of the
-        # expression for the mean.  self._f(...) therefore also returns
-        # a list
-        self._f = lambdify(newparams + newterms, d, ("numpy"))
+        # expression for the mean.  We lambdify each expression
+        # separately, rather than the list as a whole, so that design
+        # can write each column straight into a preallocated output
+        # buffer instead of packing a list of columns field by field.
+        # cse=True factors repeated subexpressions - common with
+        # interactions and factors - into temporaries evaluated once.
+        # Numbers, bare terms and products of terms - the usual linear
+        # regression columns - skip lambdify for a direct evaluator.
+        arg_index = {s: i for i, s in enumerate(newparams + newterms)}
+        self._f = []
+        for expr in d:
+            f = _column_fast_path(expr, arg_index)
+            if f is None:
+                f = _maybe_njit(lambdify(newparams + newterms, expr,
+                                         ("numpy"), cse=True))
+            self._f.append(f)
+
+        # When every design column is a bare term - the usual case for
+        # a formula of Terms and FactorTerms with no free parameters,
+        # such as a RandomEffects design - the design matrix is just
+        # the staged term block transposed.  Record the row each
+        # column gathers so design can build the output with one
+        # blocked transpose instead of a Python call per column.
+        n_params = len(newparams)
+        gather = [arg_index.get(expr) for expr in d]
+        if all(i is not None and i >= n_params for i in gather):
+            self._gather_cols = [i - n_params for i in gather]
+        else:
+            self._gather_cols = None
 
         # The input to self.design will be a recarray of that must
         # have field names that the Formula will expect to see.
@@ -801,7 +991,21 @@ class Formula:
                         'term':np.dtype([(str(t), np.float64) for t in terms]),
                         'preterm':np.dtype([(n, np.float64) for n in preterm])}
 
-        self.__terms = terms
+        # How to gather the term columns from the input recarray: plain
+        # terms copy an input field; factor terms, grouped here by
+        # factor so design can expand all levels of a factor in one
+        # pass over its column, are indicators of an input field
+        # against a level.  This depends only on the terms, so build it
+        # here rather than branching per term on every design call.
+        self._term_plan = []
+        self._factor_plan = {}
+        for i, t in enumerate(terms):
+            if not is_factor_term(t):
+                self._term_plan.append((i, t.name))
+            else:
+                self._factor_plan.setdefault(t.factor_name, []).append(
+                    (i, t.level))
+        self._setup_key = key
 
     def design(self,
                input,
@@ -837,8 +1041,11 @@ class Formula:
         """
         self._setup_design()
 
-        preterm_recarray = input
-        param_recarray = param
+        # View inputs as plain ndarrays; field access on np.recarray
+        # goes through its __array_finalize__ / attribute machinery for
+        # every field extracted below.
+        preterm_recarray = np.asarray(input)
+        param_recarray = param if param is None else np.asarray(param)
 
         # The input to design should have field names for all fields in self._dtypes['preterm']
         if not set(preterm_recarray.dtype.names).issuperset(self._dtypes['preterm'].names):
@@ -860,30 +1067,43 @@ class Formula:
             raise ValueError("none of the expressions in self.terms "
                              "are Term instances; shape of resulting "
                              "undefined")
-        # The term_recarray is essentially the same as preterm_recarray,
-        # except that all factors in self are expanded
-        # into their respective binary columns.
-        term_recarray = np.zeros(preterm_recarray.shape[0],
-                                 dtype=self._dtypes['term'])
-        for t in self.__terms:
-            if not is_factor_term(t):
-                term_recarray[t.name] = preterm_recarray[t.name]
-            else:
-                factor_col = preterm_recarray[t.factor_name]
-                # Python 3: If column type is bytes, convert to string, to allow
-                # level comparison
-                if factor_col.dtype.kind == 'S':
-                    factor_col = factor_col.astype('U')
-                fl_ind =  np.array([x == t.level
-                                    for x in factor_col]).reshape(-1)
-                term_recarray[f'{t.factor_name}_{t.level}'] = fl_ind
+        # The term columns hold essentially the same data as
+        # preterm_recarray, except that all factors in self are
+        # expanded into their respective binary columns.  They are laid
+        # out as one contiguous row per term so the columns can be
+        # handed to self._f without the strided transpose a structured
+        # view would need.
+        n_rows = preterm_recarray.shape[0]
+        term_cols = np.zeros((len(self._dtypes['term'].names), n_rows),
+                             np.float64)
+        for idx, in_name in self._term_plan:
+            term_cols[idx] = preterm_recarray[in_name]
+        for in_name, level_fields in self._factor_plan.items():
+            factor_col = preterm_recarray[in_name]
+            # Python 3: If column type is bytes, convert to string, to
+            # allow level comparison
+            if factor_col.dtype.kind == 'S':
+                factor_col = factor_col.astype('U')
+            # Encode the column once - each row gets the index of its
+            # value among the unique values - then fill the whole
+            # indicator block with a single scatter of ones, rather
+            # than comparing the column once per level.
+            uniques, codes = np.unique(factor_col, return_inverse=True)
+            row_for_code = np.full(len(uniques), -1)
+            for idx, level in level_fields:
+                # A scalar False comes back for incomparable
+                # column/level types; the indicator then stays all
+                # zero, like the elementwise comparison it replaces.
+                hits = np.flatnonzero(np.asarray(uniques == level))
+                if hits.size:
+                    row_for_code[hits[0]] = idx
+            rows = row_for_code[codes]
+            present = np.flatnonzero(rows >= 0)
+            term_cols[rows[present], present] = 1.0
         # The lambda created in self._setup_design needs to take a tuple of
-        # columns as argument, not an ndarray, so each column
-        # is extracted and put into float_tuple.
-        float_array = term_recarray.view(np.float64)
-        float_array.shape = (term_recarray.shape[0], -1)
-        float_array = float_array.T
-        float_tuple = tuple(float_array)
+        # columns as argument, not an ndarray, so each (contiguous) row
+        # of term_cols is extracted and put into float_tuple.
+        float_tuple = tuple(term_cols)
         # If there are any parameters, they also must be extracted
         # and put into a tuple with the order specified
         # by self._dtypes['param']
@@ -891,30 +1111,21 @@ class Formula:
             param = tuple(float(param_recarray[n]) for n in self._dtypes['param'].names)
         else:
             param = ()
-        # Evaluate the design at the parameters and tuple of arrays
-        D = self._f(*(param+float_tuple))
-        # TODO: check if this next stepis necessary
-        # I think it is because the lambda evaluates sympy.Number(1) to 1
-        # and not an array.
-        D_tuple = [np.asarray(w) for w in D]
-
-        need_to_modify_shape = []
-        OK_row_shapes = []
-        for i, row in enumerate(D_tuple):
-            if row.shape in [(),(1,)]:
-                need_to_modify_shape.append(i)
-            else:
-                OK_row_shapes.append(row.shape[0])
-        # Make sure that each array has the correct shape.
-        # The columns in need_to_modify should just be
-        # the intercept column, which evaluates to have shape == ().
-        # This makes sure that it has the correct number of rows.
-        for i in need_to_modify_shape:
-            D_tuple[i].shape = ()
-            D_tuple[i] = np.multiply.outer(D_tuple[i], np.ones(preterm_recarray.shape[0]))
-        # At this point, all the columns have the correct shape and the
-        # design matrix is almost ready to output.
-        D = np.array(D_tuple).T
+        # Evaluate the design at the parameters and tuple of arrays,
+        # writing each column straight into a preallocated contiguous
+        # float64 buffer.  Columns that evaluate to a scalar - such as
+        # the intercept, for which the lambda returns sympy.Number(1) as
+        # 1 - are broadcast across the rows by the assignment.
+        if self._gather_cols is not None:
+            # All columns gather staged term rows directly, so the
+            # design matrix is a transposed copy of the staged block -
+            # numpy's blocked transpose beats a per-column Python loop.
+            D = np.ascontiguousarray(term_cols[self._gather_cols].T)
+        else:
+            args = param + float_tuple
+            D = np.empty((n_rows, len(self._f)), np.float64)
+            for j, f in enumerate(self._f):
+                D[:, j] = f(*args)
         # If we will return a float matrix or any contrasts,
         # we may have some reshaping to do.
         if contrasts is None:
@@ -922,7 +1133,7 @@ class Formula:
         if return_float or contrasts:
             # If the design matrix is just a column of 1s
             # return a 1-dimensional array.
-            D = np.squeeze(D.astype(np.float64))
+            D = np.squeeze(D)
             # If there are contrasts, the pseudo-inverse of D
             # must be computed.
             if contrasts:
@@ -932,11 +1143,9 @@ class Formula:
                     _D = D
                 pinvD = np.linalg.pinv(_D)
         else:
-            # Correct the dtype.
-            # XXX There seems to be a lot of messing around with the dtype.
-            # This would be a convenient place to just add
-            # labels like a DataArray.
-            D = np.array([tuple(r) for r in D], self.dtype)
+            # View the contiguous buffer as a structured array - one
+            # field per column, no per-field copies.
+            D = D.view(self.dtype).reshape(n_rows)
         # Compute the contrast matrices, if any.
         if contrasts:
             cmatrices = {}
@@ -990,18 +1199,34 @@ def natural_spline(t, knots=None, order=3, intercept=False):
     if knots is None:
         knots = {}
     fns = []
+    # The basis functions get jit-compiled when numba is available,
+    # fusing the power, subtraction and mask of each truncated power
+    # into one pass with no intermediate arrays.
     for i in range(order+1):
         n = 'ns_%d' % i
         def f(x, i=i):
             return x**i
-        s = implemented_function(n, f)
+        s = implemented_function(n, _maybe_njit(f))
         fns.append(s(t))
 
     for j, k in enumerate(knots):
         n = 'ns_%d' % (j+i+1,)
-        def f(x, k=k, order=order):
-            return (x-k)**order * np.greater(x, k)
-        s = implemented_function(n, f)
+        if order > 0:
+            # Expand (x - k)**order into monomial coefficients once,
+            # so each evaluation is a Horner chain of multiply-adds
+            # instead of a pow per point; the mask keeps the
+            # truncation at the knot.
+            coeffs = tuple(float(sympy.binomial(order, p)) * (-float(k))**p
+                           for p in range(order + 1))
+            def f(x, coeffs=coeffs, k=k):
+                acc = x * coeffs[0] + coeffs[1]
+                for c in coeffs[2:]:
+                    acc = acc * x + c
+                return acc * np.greater(x, k)
+        else:
+            def f(x, k=k, order=order):
+                return (x-k)**order * np.greater(x, k)
+        s = implemented_function(n, _maybe_njit(f))
         fns.append(s(t))
 
     if not intercept:
@@ -1042,14 +1267,21 @@ class Factor(Formula):
         if levelsarr.ndim == 0 and levelsarr.dtype.kind in 'SOU':
             levelsarr = np.asarray(list(levels))
         if levelsarr.dtype.kind not in 'SOU': # the levels are not strings
-            if not np.all(np.equal(levelsarr, np.round(levelsarr))):
+            if np.issubdtype(levelsarr.dtype, np.integer):
+                # Already integers - no need to round-trip through round
+                levelsarr = levelsarr.astype(np.int_, copy=False)
+            elif np.all(levelsarr == levelsarr.astype(np.int_)):
+                levelsarr = levelsarr.astype(np.int_)
+            else:
                 raise ValueError('levels must be strings or ints')
-            levelsarr = levelsarr.astype(np.int_)
         elif levelsarr.dtype.kind == 'S': # Byte strings, convert
             levelsarr = levelsarr.astype('U')
         Formula.__init__(self, [FactorTerm(name, l) for l in levelsarr],
                          char=char)
         self.levels = list(levelsarr)
+        # Levels are strings or ints, so hashable; constant-time
+        # membership for get_term however many levels there are.
+        self._levels_set = frozenset(self.levels)
         self.name = name
 
     # TODO: allow different specifications of the contrasts
@@ -1059,12 +1291,12 @@ class Factor(Formula):
         """
         Retrieve a term of the Factor...
         """
-        if level not in self.levels:
+        if level not in self._levels_set:
             raise ValueError('level not found')
         return self[f"{self.name}_{str(level)}"]
 
     def _getmaineffect(self, ref=-1):
-        v = list(self._terms.copy())
+        v = list(self._terms)
         ref_term = v[ref]
         v.pop(ref)
         return Formula([vv - ref_term for vv in v])
@@ -1193,7 +1425,7 @@ def contrast_from_cols_or_rows(L, D, pseudo=None):
     if L.shape[0] != n and L.shape[1] != p:
         raise ValueError('shape of L and D mismatched')
     if pseudo is None:
-        pseudo = pinv(D)
+        pseudo = pinv(D, check_finite=False)
     if L.shape[0] == n:
         C = np.dot(pseudo, L).T
     else:
@@ -1201,7 +1433,12 @@ def contrast_from_cols_or_rows(L, D, pseudo=None):
     Lp = np.dot(D, C.T)
     if len(Lp.shape) == 1:
         Lp.shape = (n, 1)
-    Lp_rank = matrix_rank(Lp)
+    if Lp.shape[1] == 1:
+        # A single column has rank one exactly when it is nonzero; no
+        # need for an SVD to see that.
+        Lp_rank = 1 if np.any(Lp) else 0
+    else:
+        Lp_rank = matrix_rank(Lp)
     if Lp_rank != Lp.shape[1]:
         Lp = full_rank(Lp, Lp_rank)
         C = np.dot(pseudo, Lp).T
@@ -1252,8 +1489,8 @@ class RandomEffects(Formula):
         char : character for regression coefficient
         """
 
-        self._terms = np.asarray(seq)
-        q = self._terms.shape[0]
+        self._terms = tuple(seq)
+        q = len(self._terms)
 
         self._counter = 0
         if sigma is None:
@@ -1265,6 +1502,15 @@ class RandomEffects(Formula):
                              'of random effects, '
                              f'should have shape {q!r}')
         self.char = char
+        # For numeric diagonal sigma - the common case - cov can scale
+        # columns instead of doing a full matrix product; detect this
+        # once here.  None means sigma is symbolic or non-diagonal.
+        self._sigma_diag = None
+        sigma_arr = np.asarray(self.sigma)
+        if sigma_arr.dtype != object:
+            diag = np.diag(sigma_arr)
+            if np.count_nonzero(sigma_arr - np.diag(diag)) == 0:
+                self._sigma_diag = diag
 
     def cov(self, term, param=None):
         """
@@ -1285,28 +1531,45 @@ class RandomEffects(Formula):
              Covariance matrix implied by design and self.sigma.
         """
         D = self.design(term, param=param, return_float=True)
-        return np.dot(D, np.dot(self.sigma, D.T))
+        sigma = np.asarray(self.sigma)
+        if sigma.dtype == object:
+            # Symbolic covariance.  For diagonal sigma - the default
+            # construction - accumulate sum_i s_i * outer(D_i, D_i),
+            # which does one symbolic multiply per (variance, element)
+            # instead of the larger object-dtype matrix products.
+            q = sigma.shape[0]
+            off_diag = sigma[~np.eye(q, dtype=bool)]
+            if all(s == 0 for s in off_diag):
+                C = np.zeros((D.shape[0], D.shape[0]), dtype=object)
+                for i in range(q):
+                    C += sigma[i, i] * np.outer(D[:, i], D[:, i])
+                return C
+            return np.dot(D, np.dot(sigma, D.T))
+        if self._sigma_diag is not None:
+            return np.dot(D * self._sigma_diag, D.T)
+        # Let einsum pick the cheaper contraction order.
+        return np.einsum('ij,jk,lk->il', D, sigma, D, optimize=True)
 
 
 def is_term(obj):
     """ Is obj a Term?
     """
-    return hasattr(obj, "_term_flag")
+    return getattr(obj, "_term_flag", False)
 
 
 def is_factor_term(obj):
     """ Is obj a FactorTerm?
     """
-    return hasattr(obj, "_factor_term_flag")
+    return getattr(obj, "_factor_term_flag", False)
 
 
 def is_formula(obj):
     """ Is obj a Formula?
     """
-    return hasattr(obj, "_formula_flag")
+    return getattr(obj, "_formula_flag", False)
 
 
 def is_factor(obj):
     """ Is obj a Factor?
     """
-    return hasattr(obj, "_factor_flag")
+    return getattr(obj, "_factor_flag", False)
@@ -12,6 +12,7 @@ import os
 import shutil
 import warnings
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from glob import glob
 from os.path import isdir, isfile
@@ -20,6 +21,25 @@ from subprocess import check_call
 
 my_call = partial(check_call, shell=True)
 
+
+def build_dmg(mpkg):
+    """ Repackage one downloaded mpkg into a dmg """
+    pkg_name, ext = os.path.splitext(mpkg)
+    assert ext == '.mpkg'
+    # List arguments rather than a shell string; the workers run
+    # concurrently and must not trip over shell quoting.
+    check_call(['sudo', 'reown_mpkg', mpkg, 'root', 'admin'])
+    os.mkdir(pkg_name)
+    pkg_moved = pjoin(pkg_name, mpkg)
+    os.rename(mpkg, pkg_moved)
+    readme = pjoin(pkg_moved, 'Contents', 'Resources', 'ReadMe.txt')
+    if isfile(readme):
+        shutil.copy(readme, pkg_name)
+    else:
+        warnings.warn("Could not find readme with " + readme)
+    check_call(['sudo', 'hdiutil', 'create', pkg_name + '.dmg',
+                '-srcfolder', f'./{pkg_name}/', '-ov'])
+
 BUILDBOT_LOGIN = "buildbot@nipy.bic.berkeley.edu"
 BUILDBOT_HTML = "nibotmi/public_html/"
 
@@ -47,19 +67,13 @@ def main():
     try:
         my_call(f'scp -r {address} .')
         found_mpkgs = sorted(glob('*.mpkg'))
-        for mpkg in found_mpkgs:
-            pkg_name, ext = os.path.splitext(mpkg)
-            assert ext == '.mpkg'
-            my_call(f'sudo reown_mpkg {mpkg} root admin')
-            os.mkdir(pkg_name)
-            pkg_moved = pjoin(pkg_name, mpkg)
-            os.rename(mpkg, pkg_moved)
-            readme = pjoin(pkg_moved, 'Contents', 'Resources', 'ReadMe.txt')
-            if isfile(readme):
-                shutil.copy(readme, pkg_name)
-            else:
-                warnings.warn("Could not find readme with " + readme)
-            my_call(f'sudo hdiutil create {pkg_name}.dmg -srcfolder ./{pkg_name}/ -ov')
+        if found_mpkgs:
+            # Each dmg build is independent and hdiutil is happy to
+            # saturate a core compressing, so build them concurrently.
+            n_workers = min(8, len(found_mpkgs))
+            with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                # list() so worker exceptions propagate.
+                list(executor.map(build_dmg, found_mpkgs))
     finally:
         os.chdir(cwd)
 